@@ -3,15 +3,13 @@
 """
 __author__ = 'Victor Varvariuc <victor.varvariuc@gmail.com>'
 
-import argparse
-import struct
+import atexit
+import json
 import ctypes
 import fcntl
 import os
+import socket
 import sys
-from collections import OrderedDict
-
-import ioctl
 
 
 SUPPORTED_DEVICES = {
@@ -33,40 +31,67 @@ SUPPORTED_DEVICES = {
     ),
 }
 
+# Flat (vendor_id, product_id) index for a single lookup on the device-open path
+_DEVICE_INDEX = {
+    (vendor_id, product_id): (vendor_name, product_name)
+    for (vendor_id, vendor_name), products in SUPPORTED_DEVICES.items()
+    for product_id, product_name in products
+}
+
+
+class DeviceNotSupported(Exception):
+    """The HID device is not in SUPPORTED_DEVICES."""
+
+
+CACHE_PATH = os.path.expanduser('~/.cache/acdcontrol/apps.json')
+
+
+def _load_cache():
+    """Load the per-device cache; a missing or broken cache is just empty."""
+    try:
+        with open(CACHE_PATH) as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _boot_id():
+    """The kernel's boot id, or None when unavailable."""
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as boot_id_file:
+            return boot_id_file.read().strip()
+    except OSError:
+        return None
+
+
+def _init_marker_path(device_path):
+    return '/run/user/%d/acdcontrol/%s.init' % (
+        os.getuid(), os.path.basename(device_path))
+
+
+def _save_cache(cache):
+    """Write the per-device cache, ignoring filesystem errors (cache is optional)."""
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, 'w') as cache_file:
+            json.dump(cache, cache_file)
+    except OSError:
+        pass
+
 
 # -------------------------------------------------------------------------------------------------
-class StructMeta(type(ctypes.Structure)):
-    @classmethod
-    def __prepare__(metacls, cls_name, cls_bases):
-        """Use this ordered dict as class dictionary during class definition.
-        """
-        return OrderedDict()
-
-    def __new__(metacls, cls_name, cls_bases, cls_dict):
-        fields = []
-        for field_name, field in list(cls_dict.items()):
-            if isinstance(field, type) and issubclass(field, ctypes._SimpleCData):
-                fields.append((field_name, field))
-                del cls_dict[field_name]
-        cls_dict['_fields_'] = fields
-        result = super(StructMeta, metacls).__new__(
-            metacls, cls_name, cls_bases, dict(cls_dict))
-        return result
-
-    def __len__(self):
-        """Byte length."""
-        _format = ''.join(field[1]._type_ for field in self._fields_)
-        return struct.calcsize(_format)
-
-
-class Struct(ctypes.Structure, metaclass=StructMeta):
+class Struct(ctypes.Structure):
+    def __init_subclass__(cls, **kwargs):
+        """Precompute the repr template, e.g. 'hid_version(v3=%#x, v2=%#x, v1=%#x)'."""
+        super().__init_subclass__(**kwargs)
+        cls._repr_fields_ = tuple(field_name for field_name, _ in cls._fields_)
+        cls._repr_template_ = '%s(%s)' % (cls.__name__, ', '.join(
+            '%s=%s' % (field_name, '%#x' if field_type._type_ in 'bBhHiIlLqQ' else '%r')
+            for field_name, field_type in cls._fields_))
+
     def __repr__(self):
-        values = []
-        for field_name, _ in self._fields_:
-            value = getattr(self, field_name)
-            value = hex(value) if isinstance(value, int) else repr(value)
-            values.append('%s=%s' % (field_name, value))
-        return '%s(%s)' % (self.__class__.__name__, ', '.join(values))
+        return self._repr_template_ % tuple(
+            getattr(self, field_name) for field_name in self._repr_fields_)
 
 
 # /usr/src/linux-headers-3.11.0-14/include/uapi/linux/hiddev.h
@@ -74,35 +99,43 @@ class Struct(ctypes.Structure, metaclass=StructMeta):
 # Structures
 
 class hid_version(Struct):
-    v3 = ctypes.c_ubyte
-    v2 = ctypes.c_ubyte
-    v1 = ctypes.c_ushort
+    _fields_ = [
+        ('v3', ctypes.c_ubyte),
+        ('v2', ctypes.c_ubyte),
+        ('v1', ctypes.c_ushort),
+    ]
 
 
 class hiddev_devinfo(Struct):
-    bustype = ctypes.c_uint
-    busnum = ctypes.c_uint
-    devnum = ctypes.c_uint
-    ifnum = ctypes.c_uint
-    vendor = ctypes.c_ushort
-    product = ctypes.c_ushort
-    version = ctypes.c_ushort
-    num_applications = ctypes.c_uint
+    _fields_ = [
+        ('bustype', ctypes.c_uint),
+        ('busnum', ctypes.c_uint),
+        ('devnum', ctypes.c_uint),
+        ('ifnum', ctypes.c_uint),
+        ('vendor', ctypes.c_ushort),
+        ('product', ctypes.c_ushort),
+        ('version', ctypes.c_ushort),
+        ('num_applications', ctypes.c_uint),
+    ]
 
 
 class hiddev_usage_ref(Struct):
-    report_type = ctypes.c_uint
-    report_id = ctypes.c_uint
-    field_index = ctypes.c_uint
-    usage_index = ctypes.c_uint
-    usage_code = ctypes.c_uint
-    value = ctypes.c_int
+    _fields_ = [
+        ('report_type', ctypes.c_uint),
+        ('report_id', ctypes.c_uint),
+        ('field_index', ctypes.c_uint),
+        ('usage_index', ctypes.c_uint),
+        ('usage_code', ctypes.c_uint),
+        ('value', ctypes.c_int),
+    ]
 
 
 class hiddev_report_info(Struct):
-    report_type = ctypes.c_uint
-    report_id = ctypes.c_uint
-    num_fields = ctypes.c_uint
+    _fields_ = [
+        ('report_type', ctypes.c_uint),
+        ('report_id', ctypes.c_uint),
+        ('num_fields', ctypes.c_uint),
+    ]
 
 
 HID_REPORT_ID_UNKNOWN = 0xffffffff
@@ -119,120 +152,351 @@ HID_REPORT_TYPE_MAX = 3
 
 # -------------------------------------------------------------------------------------------------
 # IOCTLs (0x00 - 0x7f)
+# Precomputed with ioctl.IO/IOR/IOW/IOWR(ord('H'), nr, ctypes.sizeof(struct)),
+# matching include/uapi/linux/hiddev.h
 
-HIDIOCGVERSION = ioctl.IOR(ord('H'), 0x01, len(hid_version))
-HIDIOCAPPLICATION = ioctl.IO(ord('H'), 0x02)
-HIDIOCGDEVINFO = ioctl.IOR(ord('H'), 0x03, len(hiddev_devinfo))
+HIDIOCGVERSION = 0x80044801  # IOR('H', 0x01, hid_version)
+HIDIOCAPPLICATION = 0x00004802  # IO('H', 0x02)
+HIDIOCGDEVINFO = 0x801c4803  # IOR('H', 0x03, hiddev_devinfo)
 # HIDIOCGSTRING = ioctl.IOR(ord('H'), 0x04, len(hiddev_string_descriptor))
-HIDIOCINITREPORT = ioctl.IO(ord('H'), 0x05)
+HIDIOCINITREPORT = 0x00004805  # IO('H', 0x05)
 # HIDIOCGNAME(len)	_IOC(_IOC_READ, 'H', 0x06, len)
-HIDIOCGREPORT = ioctl.IOW(ord('H'), 0x07, len(hiddev_report_info))
-HIDIOCSREPORT = ioctl.IOW(ord('H'), 0x08, len(hiddev_report_info))
-HIDIOCGREPORTINFO = ioctl.IOWR(ord('H'), 0x09, len(hiddev_report_info))
+HIDIOCGREPORT = 0x400c4807  # IOW('H', 0x07, hiddev_report_info)
+HIDIOCSREPORT = 0x400c4808  # IOW('H', 0x08, hiddev_report_info)
+HIDIOCGREPORTINFO = 0xc00c4809  # IOWR('H', 0x09, hiddev_report_info)
 # HIDIOCGFIELDINFO	_IOWR('H', 0x0A, struct hiddev_field_info)
-HIDIOCGUSAGE = ioctl.IOWR(ord('H'), 0x0B, len(hiddev_usage_ref))  # get
-HIDIOCSUSAGE = ioctl.IOW(ord('H'), 0x0C, len(hiddev_usage_ref))  # set
-HIDIOCGUCODE = ioctl.IOWR(ord('H'), 0x0D, len(hiddev_usage_ref))
-HIDIOCGFLAG = ioctl.IOR(ord('H'), 0x0E, struct.calcsize(ctypes.c_ushort._type_))
+HIDIOCGUSAGE = 0xc018480b  # IOWR('H', 0x0B, hiddev_usage_ref)  # get
+HIDIOCSUSAGE = 0x4018480c  # IOW('H', 0x0C, hiddev_usage_ref)  # set
+HIDIOCGUCODE = 0xc018480d  # IOWR('H', 0x0D, hiddev_usage_ref)
+HIDIOCGFLAG = 0x8002480e  # IOR('H', 0x0E, c_ushort)
 # HIDIOCSFLAG		_IOW('H', 0x0F, int)
-HIDIOCGCOLLECTIONINDEX = ioctl.IOW(ord('H'), 0x10, len(hiddev_usage_ref))
+HIDIOCGCOLLECTIONINDEX = 0x40184810  # IOW('H', 0x10, hiddev_usage_ref)
 # HIDIOCGCOLLECTIONINFO	_IOWR('H', 0x11, struct hiddev_collection_info)
 # HIDIOCGPHYS(len)	_IOC(_IOC_READ, 'H', 0x12, len)
 
 # -------------------------------------------------------------------------------------------------
 BRIGHTNESS_CONTROL = 16
 USAGE_CODE = 0x820010
-# -------------------------------------------------------------------------------------------------
-
 
-arg_parser = argparse.ArgumentParser(
-    description='Set brightness on Apple and some other USB monitors.')
-arg_parser.add_argument('device', nargs='?', help='Path to the HID device')
-arg_parser.add_argument(
-    'brightness', nargs='?', default='',
-    help='New brightness level. If starts with +/-, it will be increased/decreased.')
-args = arg_parser.parse_args()
+# USB monitor usage page (0x80) in the high byte of an application usage
+_MONITOR_USAGE_MASK = 0x00ff0000
+_MONITOR_USAGE_PAGE = 0x00800000
 
-if not args.device:
-    arg_parser.print_help()
-    sys.exit(1)
+# O_CLOEXEC keeps the device fd from leaking into child processes
+_OPEN_FLAGS = os.O_RDWR | os.O_CLOEXEC
 
+# Raw libc ioctl for the brightness hot path: fcntl.ioctl re-validates and copies the
+# mutable buffer argument on every call, while the ctypes structures can be passed by
+# address directly.
+_libc_ioctl = ctypes.CDLL('libc.so.6', use_errno=True).ioctl
+_libc_ioctl.argtypes = (ctypes.c_int, ctypes.c_ulong, ctypes.c_void_p)
+_libc_ioctl.restype = ctypes.c_int
 
-mode = os.O_RDWR
-device_path = args.device
 
-device_handle = os.open(device_path, mode)
-
-version = hid_version()
-
-fcntl.ioctl(device_handle, HIDIOCGVERSION, version)
-print('hiddev driver version is %d.%d.%d' % (version.v1, version.v2, version.v3))
-
-# suck out some device information
-device_info = hiddev_devinfo()
-fcntl.ioctl(device_handle, HIDIOCGDEVINFO, device_info)
-for (vendor_id, vendor_name), products in SUPPORTED_DEVICES.items():
-    if device_info.vendor == vendor_id:
-        break
-else:
-    print('Vendor %04x is not supported.' % device_info.vendor)
-    raise SystemExit
-
-for product_id, product_name in products:
-    if device_info.product == product_id:
-        break
-else:
-    print('Product %04x is not supported.' % device_info.product)
-    raise SystemExit
-
-print('Found supported product %04x (%s) of vendor %04x (%s)' % (
-    device_info.product, product_name, device_info.vendor, vendor_name))
-
-
-# Now that we have the number of applications, we can retrieve them
-# using the HIDIOCAPPLICATION ioctl() call
-# applications are indexed from 0..{num_applications-1}
-for app_num in range(device_info.num_applications):
-    application = fcntl.ioctl(device_handle, HIDIOCAPPLICATION, app_num)
-    # The magic values come from various usage table specs
-    if (application >> 16) & 0xFF == 0x80:
-        break
-else:
-    print('The device is NOT a USB monitor!')
-    raise SystemExit
-
-
-# Initialise the internal report structures
-if fcntl.ioctl(device_handle, HIDIOCINITREPORT, 0) < 0:
-    raise SystemExit("FATAL: Failed to initialize internal report structures")
-
-usage_ref = hiddev_usage_ref(
-    report_type=HID_REPORT_TYPE_FEATURE, report_id=BRIGHTNESS_CONTROL, field_index=0,
-    usage_index=0, usage_code=USAGE_CODE)
-
-rep_info = hiddev_report_info(
-    report_type=HID_REPORT_TYPE_FEATURE, report_id=BRIGHTNESS_CONTROL, num_fields=1)
-
-# get current brightness
-if fcntl.ioctl(device_handle, HIDIOCGUSAGE, usage_ref) < 0:
-    raise SystemExit("Usage failed!")
-if fcntl.ioctl(device_handle, HIDIOCGREPORT, rep_info) < 0:
-    raise SystemExit("Report failed!")
-
-print('Current brightness is: %d' % usage_ref.value)
-
-if not args.brightness:
-    sys.exit(0)
-
-brightness = int(args.brightness)
+def _ioctl_error(what):
+    """SystemExit for a failed _libc_ioctl call, carrying the errno it left behind."""
+    errno_ = ctypes.get_errno()
+    return SystemExit('%s failed: [Errno %d] %s' % (what, errno_, os.strerror(errno_)))
+# -------------------------------------------------------------------------------------------------
 
-if args.brightness.startswith('+') or args.brightness.startswith('-'):
-    # increase/decrease brightness
-    brightness += usage_ref.value
 
-# set brightness
-usage_ref.value = brightness = max(0, brightness)
-if fcntl.ioctl(device_handle, HIDIOCSUSAGE, usage_ref) < 0:
-    raise SystemExit("Usage failed!")
-if fcntl.ioctl(device_handle, HIDIOCSREPORT, rep_info) < 0:
-    raise SystemExit("Report failed!")
+class AppleCinemaDisplay:
+    """Brightness control of a supported USB monitor via its hiddev device.
+    """
+    def __init__(self, device_path):
+        self.device_path = device_path
+        self.device_handle = os.open(device_path, _OPEN_FLAGS)
+
+        self._version = None
+
+        # suck out some device information
+        self.device_info = hiddev_devinfo()
+        fcntl.ioctl(self.device_handle, HIDIOCGDEVINFO, self.device_info)
+
+        info = _DEVICE_INDEX.get((self.device_info.vendor, self.device_info.product))
+        if info is None:
+            raise DeviceNotSupported('Device %04x:%04x is not supported.' % (
+                self.device_info.vendor, self.device_info.product))
+        self.vendor_name, self.product_name = info
+
+        # The application scan result is stable for a given device - cache it across runs
+        self._cache_key = '%04x:%04x:%d:%d' % (
+            self.device_info.vendor, self.device_info.product,
+            self.device_info.busnum, self.device_info.devnum)
+        cache_entry = self._cache_entry = _load_cache().get(self._cache_key, {})
+
+        if 'application' not in cache_entry:
+            # Now that we have the number of applications, we can retrieve them
+            # using the HIDIOCAPPLICATION ioctl() call
+            # applications are indexed from 0..{num_applications-1}
+            for app_num in range(self.device_info.num_applications):
+                application = fcntl.ioctl(self.device_handle, HIDIOCAPPLICATION, app_num)
+                # The magic values come from various usage table specs
+                if application & _MONITOR_USAGE_MASK == _MONITOR_USAGE_PAGE:
+                    break
+            else:
+                raise SystemExit('The device is NOT a USB monitor!')
+            cache_entry['application'] = app_num
+
+        # brightness as last read or written by this process; the no-op check in
+        # set_brightness trusts only this, never the on-disk value, since the monitor
+        # may have been changed externally between runs
+        self._last_value = None
+        # brightness cached by previous runs - good enough for +/- arithmetic only
+        self._cached_value = cache_entry.get('brightness')
+        # the entry is written back once at exit, keeping disk I/O off the hot path
+        atexit.register(self._flush_cache)
+
+        # Initialise the internal report structures. The kernel keeps them across
+        # opens within one boot, so a marker holding the boot id lets later runs skip
+        # the ioctl. The device identity is part of the marker: a different monitor
+        # plugged into the same hiddev slot must be initialized afresh.
+        boot_id = _boot_id()
+        marker_path = _init_marker_path(device_path)
+        marker = '%s %s' % (boot_id, self._cache_key)
+        try:
+            with open(marker_path) as marker_file:
+                initialized = boot_id is not None and marker_file.read() == marker
+        except OSError:
+            initialized = False
+        if not initialized:
+            if fcntl.ioctl(self.device_handle, HIDIOCINITREPORT, 0) < 0:
+                raise SystemExit('FATAL: Failed to initialize internal report structures')
+            if boot_id is not None:
+                try:
+                    os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+                    with open(marker_path, 'w') as marker_file:
+                        marker_file.write(marker)
+                except OSError:
+                    pass
+
+        # One arena holds both hot-path structs; the views keep the arena alive and
+        # their addresses are stable for the lifetime of the instance
+        usage_ref_size = ctypes.sizeof(hiddev_usage_ref)
+        self._buf = (ctypes.c_ubyte * (usage_ref_size + ctypes.sizeof(hiddev_report_info)))()
+        self.usage_ref = hiddev_usage_ref.from_buffer(self._buf)
+        self.rep_info = hiddev_report_info.from_buffer(self._buf, usage_ref_size)
+        self._usage_ref_address = ctypes.addressof(self.usage_ref)
+        self._rep_info_address = ctypes.addressof(self.rep_info)
+
+        self.usage_ref.report_type = HID_REPORT_TYPE_FEATURE
+        self.usage_ref.report_id = BRIGHTNESS_CONTROL
+        self.usage_ref.usage_code = USAGE_CODE
+
+        self.rep_info.report_type = HID_REPORT_TYPE_FEATURE
+        self.rep_info.report_id = BRIGHTNESS_CONTROL
+        self.rep_info.num_fields = 1
+
+    def _flush_cache(self):
+        """Persist this device's cache entry; registered to run once at exit.
+
+        The cache is re-read first so entries other processes wrote meanwhile are
+        kept instead of being clobbered by our stale copy.
+        """
+        if self._last_value is not None:
+            self._cache_entry['brightness'] = self._last_value
+        cache = _load_cache()
+        if cache.get(self._cache_key) != self._cache_entry:
+            cache[self._cache_key] = self._cache_entry
+            _save_cache(cache)
+
+    @property
+    def version(self):
+        """hiddev driver version; purely informational, so fetched on first use."""
+        if self._version is None:
+            self._version = hid_version()
+            fcntl.ioctl(self.device_handle, HIDIOCGVERSION, self._version)
+        return self._version
+
+    def get_brightness(self, _ioctl=_libc_ioctl, _g_usage=HIDIOCGUSAGE, _g_report=HIDIOCGREPORT):
+        """Fetch the current brightness from the device.
+
+        The keyword arguments are default-bound module globals (LOAD_FAST instead of
+        LOAD_GLOBAL on each call) - not part of the API.
+        """
+        device_handle = self.device_handle
+        if _ioctl(device_handle, _g_usage, self._usage_ref_address) < 0:
+            raise _ioctl_error('Usage')
+        if _ioctl(device_handle, _g_report, self._rep_info_address) < 0:
+            raise _ioctl_error('Report')
+        # a fresh reading supersedes whatever adjust_brightness would have trusted
+        self._last_value = value = self.usage_ref.value
+        return value
+
+    def set_brightness(self, value, _ioctl=_libc_ioctl, _s_usage=HIDIOCSUSAGE,
+                       _s_report=HIDIOCSREPORT):
+        """Set an absolute brightness level on the device."""
+        value = max(0, value)
+        if value == self._last_value:
+            # nothing to write - saves the SUSAGE/SREPORT pair
+            return value
+        self.usage_ref.value = value
+        device_handle = self.device_handle
+        if _ioctl(device_handle, _s_usage, self._usage_ref_address) < 0:
+            raise _ioctl_error('Usage')
+        if _ioctl(device_handle, _s_report, self._rep_info_address) < 0:
+            raise _ioctl_error('Report')
+        self._last_value = value
+        return value
+
+    def adjust_brightness(self, increment):
+        """Increase/decrease brightness by the given (possibly negative) amount.
+
+        Trusts the last value seen by this process, or failing that the one cached
+        by previous runs, to skip the HIDIOCGUSAGE/HIDIOCGREPORT round-trip.
+        """
+        last_value = self._last_value
+        if last_value is None:
+            last_value = self._cached_value
+        if last_value is not None:
+            return self.set_brightness(last_value + increment)
+        return self.set_brightness(self.get_brightness() + increment)
+
+
+USAGE = '''\
+usage: acdcontrol.py [-h] [--daemon] [device] [brightness]
+
+Set brightness on Apple and some other USB monitors.
+
+positional arguments:
+  device      Path to the HID device
+  brightness  New brightness level. If starts with +/-, it will be
+              increased/decreased.
+
+options:
+  -h, --help  show this help message and exit
+  --daemon    hold the device open and serve requests over a Unix socket'''
+
+
+def _socket_path(device_path):
+    # one socket per device, so a client asking for hiddev1 never reaches a
+    # daemon serving hiddev0
+    return '/run/user/%d/acdcontrol-%s.sock' % (
+        os.getuid(), os.path.basename(device_path))
+
+
+def run_daemon(device_path):
+    """Hold the device open and serve GET / SET <n> / ADJ <+/-n> over a Unix socket.
+
+    Amortizes the open/GDEVINFO/APPLICATION/INITREPORT startup across all requests:
+    a keybind press costs one socket round-trip plus the two set ioctls.
+    """
+    try:
+        display = AppleCinemaDisplay(device_path)
+    except DeviceNotSupported as exc:
+        raise SystemExit(str(exc))
+    socket_path = _socket_path(device_path)
+    try:
+        os.unlink(socket_path)
+    except OSError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    print('Serving %s on %s' % (device_path, socket_path))
+    while True:
+        connection, _ = server.accept()
+        # one bad client or one failed ioctl must not take the daemon down
+        with connection:
+            response = None
+            try:
+                request = connection.recv(64).decode().split()
+                if request and request[0] == 'GET':
+                    value = display.get_brightness()
+                elif request and request[0] == 'SET':
+                    value = display.set_brightness(int(request[1]))
+                elif request and request[0] == 'ADJ':
+                    value = display.adjust_brightness(int(request[1]))
+                else:
+                    raise ValueError('unknown command %r' % ' '.join(request))
+                response = b'%d\n' % value
+            except (IndexError, ValueError, UnicodeDecodeError) as exc:
+                response = ('ERR %s\n' % exc).encode()
+            except SystemExit as exc:
+                # get/set_brightness raise SystemExit on ioctl failure
+                print('ERR %s' % exc, file=sys.stderr)
+                response = ('ERR %s\n' % exc).encode()
+            except OSError as exc:
+                # client vanished mid-request - nothing to reply to
+                print('ERR %s' % exc, file=sys.stderr)
+            if response is not None:
+                try:
+                    connection.sendall(response)
+                except OSError:
+                    pass
+
+
+def _ask_daemon(device_path, command):
+    """Send a command to a daemon serving this device; None when none is listening."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(_socket_path(device_path))
+        client.sendall(command.encode() + b'\n')
+        response = client.recv(64)
+        if not response:
+            # daemon died before replying - let the caller fall back to direct access
+            return None
+        return response.decode().strip()
+    except OSError:
+        return None
+    finally:
+        client.close()
+
+
+def main():
+    # argparse costs more bytecode at startup than all the ioctls combined - the
+    # two-positional CLI is parsed by hand
+    argv = sys.argv[1:]
+    if '-h' in argv or '--help' in argv:
+        print(USAGE)
+        sys.exit(0)
+    if not argv:
+        print(USAGE)
+        sys.exit(1)
+    if argv[0] == '--daemon':
+        if len(argv) < 2:
+            print(USAGE)
+            sys.exit(1)
+        run_daemon(argv[1])
+        return
+    device = argv[0]
+    brightness = argv[1] if len(argv) > 1 else ''
+
+    # a running daemon already holds the device open - use it when present
+    if brightness.startswith('+') or brightness.startswith('-'):
+        command = 'ADJ %s' % brightness
+    elif brightness:
+        command = 'SET %s' % brightness
+    else:
+        command = 'GET'
+    response = _ask_daemon(device, command)
+    if response is not None:
+        if response.startswith('ERR'):
+            raise SystemExit(response)
+        print('Current brightness is: %s' % response)
+        return
+
+    try:
+        display = AppleCinemaDisplay(device)
+    except DeviceNotSupported as exc:
+        raise SystemExit(str(exc))
+
+    print('hiddev driver version is %d.%d.%d' % (
+        display.version.v1, display.version.v2, display.version.v3))
+    print('Found supported product %04x (%s) of vendor %04x (%s)' % (
+        display.device_info.product, display.product_name,
+        display.device_info.vendor, display.vendor_name))
+    print('Current brightness is: %d' % display.get_brightness())
+
+    if not brightness:
+        sys.exit(0)
+
+    if brightness.startswith('+') or brightness.startswith('-'):
+        # increase/decrease brightness
+        display.adjust_brightness(int(brightness))
+    else:
+        display.set_brightness(int(brightness))
+
+
+if __name__ == '__main__':
+    main()